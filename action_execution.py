@@ -9,11 +9,16 @@ LLM recommendations, such as changing system settings, managing processes,
 and displaying notifications.
 """
 
+import ctypes
+import ctypes.wintypes
 import logging
 import os
 import subprocess
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 import psutil
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, List, Any, Optional, Set, Union
 
 # For Windows notifications
 from win32api import *
@@ -22,6 +27,23 @@ from win32con import *
 
 logger = logging.getLogger('action_execution')
 
+# Direct kernel32 bindings for terminating processes without psutil wrappers
+_PROCESS_TERMINATE = 0x0001
+_PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+_MAX_IMAGE_PATH = 32768
+
+_kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+_kernel32.OpenProcess.argtypes = (ctypes.wintypes.DWORD, ctypes.wintypes.BOOL, ctypes.wintypes.DWORD)
+_kernel32.OpenProcess.restype = ctypes.wintypes.HANDLE
+_kernel32.QueryFullProcessImageNameW.argtypes = (
+    ctypes.wintypes.HANDLE, ctypes.wintypes.DWORD,
+    ctypes.wintypes.LPWSTR, ctypes.POINTER(ctypes.wintypes.DWORD))
+_kernel32.QueryFullProcessImageNameW.restype = ctypes.wintypes.BOOL
+_kernel32.TerminateProcess.argtypes = (ctypes.wintypes.HANDLE, ctypes.wintypes.UINT)
+_kernel32.TerminateProcess.restype = ctypes.wintypes.BOOL
+_kernel32.CloseHandle.argtypes = (ctypes.wintypes.HANDLE,)
+_kernel32.CloseHandle.restype = ctypes.wintypes.BOOL
+
 
 class ActionExecutor:
     """Handles execution of system actions based on LLM recommendations."""
@@ -35,6 +57,22 @@ class ActionExecutor:
             'close_application': self._close_application,
             'start_application': self._start_application
         }
+        
+        # Lowercase process name -> PIDs, refreshed incrementally
+        self._name_index: Dict[str, Set[int]] = {}
+        self._pid_names: Dict[int, str] = {}
+        self._last_seen_pids: Set[int] = set()
+        self._index_lock = threading.Lock()
+        
+        # Hidden window that owns the notification icon, created on first use.
+        # A window can only be destroyed by the thread that created it, so
+        # every notification call runs on one dedicated thread
+        self._notification_thread = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='notifications')
+        self._hwnd = None
+        self._class_atom = None
+        self._hinst = None
+        self._icon_added = False
     
     def execute_actions(self, actions: List[Dict]) -> List[str]:
         """Execute a list of actions.
@@ -82,11 +120,7 @@ class ActionExecutor:
                 process.terminate()
                 return f"Process with PID {pid} terminated"
             elif name:
-                count = 0
-                for process in psutil.process_iter(['pid', 'name']):
-                    if process.info['name'].lower() == name.lower():
-                        process.terminate()
-                        count += 1
+                count = self._terminate_by_name(name)
                 return f"{count} processes named '{name}' terminated"
             else:
                 return "No PID or process name provided"
@@ -97,6 +131,124 @@ class ActionExecutor:
         except Exception as e:
             return f"Error terminating process: {e}"
     
+    def _refresh_index(self):
+        """Fold newly spawned and exited processes into the name index.
+        
+        Only PIDs that appeared since the previous refresh have their name
+        read; PIDs that disappeared are dropped from the index. A PID reused
+        between two refreshes keeps its old name until _terminate_by_name
+        finds the mismatch and re-indexes it.
+        """
+        current = set(psutil.pids())
+        
+        for pid in self._last_seen_pids - current:
+            self._index_pid(pid, None)
+        
+        for pid in current - self._last_seen_pids:
+            try:
+                process = psutil.Process(pid)
+                with process.oneshot():
+                    pname = process.name().lower()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+            self._index_pid(pid, pname)
+        
+        self._last_seen_pids = current
+    
+    def _index_pid(self, pid: int, pname: Optional[str]):
+        """Record the name of a PID in the index, replacing any previous one.
+        
+        Args:
+            pid: Process ID
+            pname: Lowercase process name, or None to remove the PID
+        """
+        old_name = self._pid_names.pop(pid, None)
+        if old_name is not None:
+            pids = self._name_index.get(old_name)
+            if pids is not None:
+                pids.discard(pid)
+                if not pids:
+                    del self._name_index[old_name]
+        
+        if pname is not None:
+            self._pid_names[pid] = pname
+            self._name_index.setdefault(pname, set()).add(pid)
+    
+    def _find_pids(self, name: str) -> Set[int]:
+        """Look up the PIDs of processes with the given name, ignoring case.
+        
+        Args:
+            name: Process name to match
+            
+        Returns:
+            Set of matching PIDs
+        """
+        target = name.lower()
+        with self._index_lock:
+            # The refresh lists PIDs once and only opens those spawned since
+            # the last lookup, so warm lookups avoid opening every process
+            self._refresh_index()
+            return set(self._name_index.get(target, ()))
+    
+    def _terminate_by_name(self, name: str) -> int:
+        """Terminate every process whose name matches, ignoring case.
+        
+        Args:
+            name: Process name to match
+            
+        Returns:
+            Number of processes terminated
+        """
+        target = name.lower()
+        image_path = ctypes.create_unicode_buffer(_MAX_IMAGE_PATH)
+        access = _PROCESS_TERMINATE | _PROCESS_QUERY_LIMITED_INFORMATION
+        count = 0
+        
+        for pid in self._find_pids(name):
+            handle = _kernel32.OpenProcess(access, False, pid)
+            if not handle:
+                # Already exited or access denied
+                continue
+            try:
+                # Guard against the PID having been reused since indexing;
+                # the open handle keeps the process from being replaced
+                size = ctypes.wintypes.DWORD(_MAX_IMAGE_PATH)
+                if not _kernel32.QueryFullProcessImageNameW(handle, 0, image_path, ctypes.byref(size)):
+                    continue
+                pname = os.path.basename(image_path.value).lower()
+                if pname != target:
+                    # Reused by another program; index it under its real name
+                    with self._index_lock:
+                        self._index_pid(pid, pname)
+                    continue
+                if _kernel32.TerminateProcess(handle, 1):
+                    count += 1
+            finally:
+                _kernel32.CloseHandle(handle)
+        
+        return count
+    
+    def _ensure_notification_window(self):
+        """Create the hidden window that owns the notification icon, once."""
+        if self._hwnd is not None:
+            return
+        
+        wc = WNDCLASS()
+        hinst = wc.hInstance = GetModuleHandle(None)
+        wc.lpszClassName = "PythonTaskbar"
+        wc.lpfnWndProc = DefWindowProc
+        class_atom = RegisterClass(wc)
+        
+        style = WS_OVERLAPPED | WS_SYSMENU
+        hwnd = CreateWindow(class_atom, "Taskbar", style,
+                          0, 0, CW_USEDEFAULT, CW_USEDEFAULT,
+                          0, 0, hinst, None)
+        UpdateWindow(hwnd)
+        
+        self._hinst = hinst
+        self._class_atom = class_atom
+        self._hwnd = hwnd
+    
     def _show_notification(self, title: str, message: str) -> str:
         """Show a Windows notification.
         
@@ -108,33 +260,51 @@ class ActionExecutor:
             Result message
         """
         try:
-            # Initialize notification parameters
-            wc = WNDCLASS()
-            hinst = wc.hInstance = GetModuleHandle(None)
-            wc.lpszClassName = "PythonTaskbar"
-            wc.lpfnWndProc = DefWindowProc
-            classAtom = RegisterClass(wc)
-            
-            # Create the window
-            style = WS_OVERLAPPED | WS_SYSMENU
-            hwnd = CreateWindow(classAtom, "Taskbar", style,
-                              0, 0, CW_USEDEFAULT, CW_USEDEFAULT,
-                              0, 0, hinst, None)
-            UpdateWindow(hwnd)
-            
-            # Show notification
-            Shell_NotifyIcon(NIM_ADD, (
-                hwnd, 0, NIF_ICON | NIF_MESSAGE | NIF_TIP,
-                WM_USER+20, hinst, "Notification", message, 0, 0, "Tooltip"))
-            
-            # Clean up
-            DestroyWindow(hwnd)
-            UnregisterClass(wc.lpszClassName, None)
-            
+            self._notification_thread.submit(self._notify, title, message).result()
             return "Notification displayed"
         except Exception as e:
             return f"Error showing notification: {e}"
     
+    def _notify(self, title: str, message: str):
+        """Show a notification balloon; runs on the notification thread.
+        
+        Args:
+            title: Notification title
+            message: Notification message
+        """
+        self._ensure_notification_window()
+        
+        # Add the icon on first use, then just update its balloon text
+        icon = LoadIcon(0, IDI_APPLICATION)
+        flags = NIF_ICON | NIF_MESSAGE | NIF_TIP | NIF_INFO
+        Shell_NotifyIcon(NIM_MODIFY if self._icon_added else NIM_ADD, (
+            self._hwnd, 0, flags, WM_USER+20, icon,
+            "AI Smart Laptop Management", message, 200, title))
+        self._icon_added = True
+    
+    def close(self):
+        """Remove the notification icon and stop the notification thread."""
+        if self._hwnd is not None:
+            try:
+                self._notification_thread.submit(self._destroy_notification_window).result()
+            except Exception as e:
+                logger.warning(f"Error cleaning up notification window: {e}")
+        
+        self._notification_thread.shutdown(wait=False)
+    
+    def _destroy_notification_window(self):
+        """Destroy the hidden window; runs on the notification thread."""
+        try:
+            if self._icon_added:
+                Shell_NotifyIcon(NIM_DELETE, (self._hwnd, 0))
+            DestroyWindow(self._hwnd)
+            UnregisterClass(self._class_atom, self._hinst)
+        finally:
+            self._hwnd = None
+            self._class_atom = None
+            self._hinst = None
+            self._icon_added = False
+    
     def _set_power_plan(self, plan: str) -> str:
         """Change the Windows power plan.
         
@@ -156,15 +326,48 @@ class ActionExecutor:
                 return f"Unknown power plan: {plan}"
             
             guid = power_plans[plan.lower()]
-            result = subprocess.run(['powercfg', '/s', guid], capture_output=True, text=True)
+            if self._power_set_active_scheme(guid):
+                return f"Power plan changed to {plan}"
             
-            if result.returncode == 0:
+            # Fall back to the powercfg command line tool; only stderr is
+            # captured, and it is read directly rather than via reader threads
+            process = subprocess.Popen(
+                ['powercfg', '/s', guid],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                close_fds=False,
+                creationflags=subprocess.CREATE_NO_WINDOW
+            )
+            with process.stderr:
+                stderr = process.stderr.read()
+            returncode = process.wait()
+            
+            if returncode == 0:
                 return f"Power plan changed to {plan}"
             else:
-                return f"Error changing power plan: {result.stderr}"
+                return f"Error changing power plan: {stderr.decode('ascii', 'replace')}"
         except Exception as e:
             return f"Error setting power plan: {e}"
     
+    def _power_set_active_scheme(self, guid: str) -> bool:
+        """Activate a power scheme directly through powrprof.dll.
+        
+        Args:
+            guid: GUID string of the power scheme
+            
+        Returns:
+            Boolean indicating if the scheme was activated
+        """
+        try:
+            scheme = (ctypes.c_ubyte * 16).from_buffer_copy(uuid.UUID(guid).bytes_le)
+            rc = ctypes.windll.powrprof.PowerSetActiveScheme(None, ctypes.byref(scheme))
+            if rc != 0:
+                logger.warning(f"PowerSetActiveScheme failed with error code {rc}")
+            return rc == 0
+        except Exception as e:
+            logger.warning(f"Error calling PowerSetActiveScheme: {e}")
+            return False
+    
     def _close_application(self, name: str) -> str:
         """Close an application gracefully.
         
@@ -175,12 +378,8 @@ class ActionExecutor:
             Result message
         """
         try:
-            count = 0
-            for process in psutil.process_iter(['pid', 'name']):
-                if process.info['name'].lower() == name.lower():
-                    # Try to close gracefully first
-                    process.terminate()
-                    count += 1
+            # Try to close gracefully first
+            count = self._terminate_by_name(name)
             
             if count > 0:
                 return f"{count} instances of {name} closed"
@@ -200,14 +399,22 @@ class ActionExecutor:
             Result message
         """
         try:
-            if not os.path.exists(path):
+            if not os.path.isfile(path):
                 return f"Application not found: {path}"
             
             cmd = [path]
             if args:
                 cmd.extend(args)
             
-            process = subprocess.Popen(cmd)
+            # Launch detached, without allocating a console window
+            process = subprocess.Popen(
+                cmd,
+                close_fds=False,
+                creationflags=subprocess.CREATE_NO_WINDOW | subprocess.DETACHED_PROCESS,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
             return f"Application started with PID {process.pid}"
         except Exception as e:
             return f"Error starting application: {e}"
@@ -237,4 +444,6 @@ if __name__ == '__main__':
     
     results = executor.execute_actions(test_actions)
     for result in results:
-        print(f"\nResult: {result}")
\ No newline at end of file
+        print(f"\nResult: {result}")
+    
+    executor.close()
\ No newline at end of file
@@ -8,12 +8,22 @@ This module handles the transformation of raw sensor data into a format
 suitable for the LLM, including data cleaning, normalization, and feature extraction.
 """
 
-import json
+import heapq
 import logging
-from typing import Dict, List, Any, Optional, Union
+import re
+from typing import Dict, Iterable, Iterator, List, Any, Mapping, Optional, Tuple, Union
+
+import orjson
 
 logger = logging.getLogger('data_processing')
 
+# Matches each line that starts an action directive
+_ACTION_LINE_RE = re.compile(r'^ACTION:.*', re.MULTILINE)
+
+# Parses one directive line, without its newline: "ACTION: name" or
+# "ACTION: name with params"
+_ACTION_RE = re.compile(r'ACTION:\s*(\S+)(?:\s+with\s+(.+?))?\s*')
+
 
 class DataProcessor:
     """Handles processing of system data and user input for LLM consumption."""
@@ -37,11 +47,8 @@ class DataProcessor:
         Returns:
             Processed data ready for LLM consumption
         """
-        # Clean and normalize the data
-        cleaned_data = self._clean_data(system_data)
-        
-        # Extract relevant features
-        features = self._extract_features(cleaned_data)
+        # Clean and normalize the data and extract relevant features
+        cleaned_data, features = self._clean_and_featurize(system_data)
         
         # Combine with user input
         prompt = self._create_prompt(user_input, features)
@@ -52,75 +59,104 @@ class DataProcessor:
             'raw_data': cleaned_data
         }
     
-    def _clean_data(self, data: Dict) -> Dict:
-        """Clean and normalize the raw system data.
+    def process_with_gate(self, user_input: str, system_data: Dict) -> Tuple[bool, Optional[Dict]]:
+        """Check for critical conditions and, if any, process the data for the LLM.
+        
+        Combines should_take_action and process so the data is only cleaned
+        and featurized once.
         
         Args:
-            data: Raw system data from sensors
+            user_input: The command or request from the user
+            system_data: Dictionary containing system sensor data
             
         Returns:
-            Cleaned and normalized data
+            Tuple of whether action should be taken and the processed data,
+            which is None when no action is needed
         """
-        cleaned = {}
+        cleaned_data, features = self._clean_and_featurize(system_data)
         
-        # Handle missing or invalid values
-        for key, value in data.items():
-            if key in ['cpu_usage', 'memory_usage', 'disk_usage'] and isinstance(value, (int, float)):
-                # Ensure percentages are between 0-100
-                cleaned[key] = max(0, min(100, value))
-            elif key == 'running_processes' and isinstance(value, list):
-                # Limit to top processes by resource usage
-                cleaned[key] = sorted(value, key=lambda x: x.get('cpu_usage', 0), reverse=True)[:10]
-            elif key == 'system_logs' and isinstance(value, list):
-                # Filter to recent and relevant logs
-                cleaned[key] = [log for log in value if log.get('level') in ['ERROR', 'WARNING']][:5]
-            else:
-                cleaned[key] = value
+        if not self._is_critical(features):
+            return False, None
+        
+        prompt = self._create_prompt(user_input, features)
         
-        return cleaned
+        return True, {
+            'prompt': prompt,
+            'features': features,
+            'raw_data': cleaned_data
+        }
     
-    def _extract_features(self, data: Dict) -> Dict:
-        """Extract relevant features from the cleaned data.
+    def _clean_and_featurize(self, data: Dict) -> Tuple[Dict, Dict]:
+        """Clean and normalize the raw system data and extract features in one pass.
         
         Args:
-            data: Cleaned system data
+            data: Raw system data from sensors
             
         Returns:
-            Dictionary of extracted features
+            Tuple of the cleaned data and the dictionary of extracted features
         """
-        features = {}
-        
-        # System resource usage
-        features['high_cpu'] = data.get('cpu_usage', 0) > self.threshold_config['cpu_usage']
-        features['high_memory'] = data.get('memory_usage', 0) > self.threshold_config['memory_usage']
-        # Handle disk_usage which is a dictionary with a 'percent' key
-        if isinstance(data.get('disk_usage'), dict):
-            features['high_disk'] = data.get('disk_usage', {}).get('percent', 0) > self.threshold_config['disk_usage']
-        else:
-            features['high_disk'] = False
+        cleaned = {}
+        thresholds = self.threshold_config
+        features = {
+            'high_cpu': False,
+            'high_memory': False,
+            'high_disk': False,
+            'low_battery': False,
+            'is_charging': True,  # Assume desktop or plugged in
+            'has_errors': False,
+            'has_warnings': False
+        }
         
-        # Battery status
-        if 'battery' in data:
-            features['low_battery'] = data['battery'].get('percentage', 100) < self.threshold_config['battery_low']
-            features['is_charging'] = data['battery'].get('is_charging', False)
-        else:
-            features['low_battery'] = False
-            features['is_charging'] = True  # Assume desktop or plugged in
-        
-        # System state
-        features['has_errors'] = any(log.get('level') == 'ERROR' for log in data.get('system_logs', []))
-        features['has_warnings'] = any(log.get('level') == 'WARNING' for log in data.get('system_logs', []))
-        
-        # Resource-intensive processes
-        if 'running_processes' in data and data['running_processes']:
-            top_process = data['running_processes'][0]
-            features['top_process'] = {
-                'name': top_process.get('name', 'unknown'),
-                'cpu_usage': top_process.get('cpu_usage', 0),
-                'memory_usage': top_process.get('memory_usage', 0)
-            }
-        
-        return features
+        # Handle missing or invalid values, setting features as we go
+        for key, value in data.items():
+            if key in ('cpu_usage', 'memory_usage', 'disk_usage') and isinstance(value, (int, float)):
+                # Ensure percentages are between 0-100
+                value = max(0, min(100, value))
+                if key == 'cpu_usage':
+                    features['high_cpu'] = value > thresholds['cpu_usage']
+                elif key == 'memory_usage':
+                    features['high_memory'] = value > thresholds['memory_usage']
+            elif key == 'disk_usage' and isinstance(value, Mapping):
+                # Handle disk_usage which maps each drive to a dictionary with
+                # a 'percent' key, or is a single such dictionary
+                if 'percent' in value:
+                    percents = [value['percent']]
+                else:
+                    percents = [drive.get('percent', 0) for drive in value.values()
+                                if isinstance(drive, Mapping)]
+                features['high_disk'] = any(p > thresholds['disk_usage'] for p in percents)
+            elif key == 'battery' and isinstance(value, Mapping):
+                features['low_battery'] = value.get('percentage', 100) < thresholds['battery_low']
+                features['is_charging'] = value.get('is_charging', False)
+            elif key == 'running_processes' and isinstance(value, (list, tuple)):
+                # Limit to top processes by resource usage
+                value = heapq.nlargest(10, value, key=lambda x: x.cpu_usage or 0)
+                if value:
+                    top_process = value[0]
+                    features['top_process'] = {
+                        'name': top_process.name or 'unknown',
+                        'cpu_usage': top_process.cpu_usage or 0,
+                        'memory_usage': top_process.memory_usage or 0
+                    }
+            elif key == 'system_logs' and isinstance(value, (list, tuple)):
+                # Filter to recent and relevant logs
+                relevant = []
+                for log in value:
+                    level = log.level
+                    if level == 'ERROR':
+                        features['has_errors'] = True
+                    elif level == 'WARNING':
+                        features['has_warnings'] = True
+                    else:
+                        continue
+                    relevant.append(log)
+                    if len(relevant) == 5:
+                        break
+                value = relevant
+            
+            cleaned[key] = value
+        
+        return cleaned, features
     
     def _create_prompt(self, user_input: str, features: Dict) -> str:
         """Create a prompt for the LLM based on user input and features.
@@ -184,43 +220,86 @@ class DataProcessor:
         Returns:
             List of action dictionaries
         """
-        actions = []
-        lines = llm_response.split('\n')
-        
-        for line in lines:
-            if line.startswith('ACTION:'):
-                # Parse the action directive
-                action_text = line[7:].strip()  # Remove 'ACTION: ' prefix
-                
-                # Extract action name and parameters
-                if ' with ' in action_text:
-                    action_name, params_text = action_text.split(' with ', 1)
-                    # Parse parameters
-                    params = {}
-                    try:
-                        # Try to parse as JSON if it looks like it
-                        if params_text.startswith('{') and params_text.endswith('}'):
-                            params = json.loads(params_text)
-                        else:
-                            # Simple key-value parsing
-                            for param in params_text.split(','):
-                                if '=' in param:
-                                    key, value = param.split('=', 1)
-                                    params[key.strip()] = value.strip()
-                    except Exception as e:
-                        logger.warning(f"Failed to parse action parameters: {e}")
-                        params = {'raw_params': params_text}
+        return list(self._parse_actions(llm_response))
+    
+    def extract_actions_stream(self, chunks: Iterable[str]) -> Iterator[Dict]:
+        """Extract action directives from a streamed LLM response.
+        
+        Actions are yielded as soon as the line containing them is complete,
+        so only the current partial line is buffered.
+        
+        Args:
+            chunks: Chunks of the LLM response as they arrive
+            
+        Yields:
+            Action dictionaries
+        """
+        buf = []
+        for chunk in chunks:
+            buf.append(chunk)
+            if '\n' not in chunk:
+                continue
+            
+            complete, _, tail = ''.join(buf).rpartition('\n')
+            buf = [tail] if tail else []
+            yield from self._parse_actions(complete)
+        
+        # Flush the final line, which has no trailing newline
+        if buf:
+            yield from self._parse_actions(''.join(buf))
+    
+    def _parse_actions(self, text: str) -> Iterator[Dict]:
+        """Parse the action directive lines in a block of complete lines.
+        
+        Directive lines that cannot be parsed are logged and skipped.
+        
+        Args:
+            text: One or more complete lines of the LLM response
+            
+        Yields:
+            Action dictionaries
+        """
+        for line in _ACTION_LINE_RE.finditer(text):
+            match = _ACTION_RE.fullmatch(line.group(0))
+            if match is None:
+                logger.warning(f"Ignoring malformed action directive: {line.group(0).strip()}")
+                continue
+            yield self._action_from_match(match)
+    
+    def _action_from_match(self, match: re.Match) -> Dict:
+        """Build an action dictionary from a matched action directive.
+        
+        Args:
+            match: Match of _ACTION_RE against an action line
+            
+        Returns:
+            Action dictionary with name, parameters and description
+        """
+        action_name, params_text = match.group(1), match.group(2)
+        action_text = match.group(0)[len('ACTION:'):].strip()
+        
+        # Parse parameters
+        params = {}
+        if params_text:
+            try:
+                # Try to parse as JSON if it looks like it
+                if params_text.startswith('{') and params_text.endswith('}'):
+                    params = orjson.loads(params_text)
                 else:
-                    action_name = action_text
-                    params = {}
-                
-                actions.append({
-                    'name': action_name.strip(),
-                    'parameters': params,
-                    'description': action_text
-                })
-        
-        return actions
+                    # Simple key-value parsing
+                    for param in params_text.split(','):
+                        key, sep, value = param.partition('=')
+                        if sep:
+                            params[key.strip()] = value.strip()
+            except Exception as e:
+                logger.warning(f"Failed to parse action parameters: {e}")
+                params = {'raw_params': params_text}
+        
+        return {
+            'name': action_name,
+            'parameters': params,
+            'description': action_text
+        }
     
     def should_take_action(self, system_data: Dict) -> bool:
         """Determine if automatic action should be taken based on system data.
@@ -231,12 +310,20 @@ class DataProcessor:
         Returns:
             Boolean indicating if action should be taken
         """
-        # Clean the data
-        cleaned_data = self._clean_data(system_data)
+        # Clean the data and extract features
+        _, features = self._clean_and_featurize(system_data)
         
-        # Extract features
-        features = self._extract_features(cleaned_data)
+        return self._is_critical(features)
+    
+    def _is_critical(self, features: Dict) -> bool:
+        """Determine if the extracted features indicate a critical condition.
         
+        Args:
+            features: Extracted system features
+            
+        Returns:
+            Boolean indicating if action should be taken
+        """
         # Check for critical conditions
         critical_conditions = [
             features.get('high_cpu', False),
@@ -8,20 +8,39 @@ This module serves as the core application that manages the workflow between
 user input, system sensors, Ollama LLM, and action execution.
 """
 
-import json
+import asyncio
+import atexit
+import functools
 import logging
+import logging.handlers
 import os
+import queue
 import sys
 import time
-from typing import Dict, List, Any, Optional, Union
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from pathlib import Path
+from typing import Callable, Dict, List, Any, Mapping, Optional, Union
 
-# Configure logging
+import orjson
+from prompt_toolkit import PromptSession
+
+# Configure logging; the log file is written by a background listener so
+# callers only pay for enqueueing a record. The listener runs as long as
+# its handler is installed, and flushes the queue when the process exits
+_log_queue = queue.Queue(-1)
+_log_listener = logging.handlers.QueueListener(
+    _log_queue,
+    logging.handlers.RotatingFileHandler(
+        'laptop_agent.log', maxBytes=5_000_000, backupCount=3, delay=True)
+)
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
         logging.StreamHandler(sys.stdout),
-        logging.FileHandler('laptop_agent.log')
+        logging.handlers.QueueHandler(_log_queue)
     ]
 )
 logger = logging.getLogger('local_agent')
@@ -36,23 +55,34 @@ from ollama_interface import OllamaInterface
 class LocalAgent:
     """Core agent that orchestrates the AI laptop management workflow."""
     
-    def __init__(self, config_path: str = 'config.json'):
+    def __init__(self, config_path: str = 'config.json', background: bool = False):
         """Initialize the local agent with configuration.
         
         Args:
             config_path: Path to the configuration file
+            background: Whether the agent will run as a background service
         """
         self.config = self._load_config(config_path)
         
         # Initialize components
         self.data_processor = DataProcessor()
-        self.sensor_manager = SystemSensorManager()
+        # The background service only needs readings once per check, so it
+        # refreshes them then rather than sampling continuously in between
+        sample_interval = None if background else self.config.get('sensor_sample_interval', 1.0)
+        self.sensor_manager = SystemSensorManager(sample_interval=sample_interval)
         self.action_executor = ActionExecutor()
         
         # Initialize Ollama interface with the configured model
         model_name = self.config.get('llm_model', 'llama3.2:1b')
         self.ollama = OllamaInterface(model_name)
         
+        # Workers for the background service: one for LLM calls, so a slow
+        # generation can be timed out without blocking the schedule, and one
+        # for prefetching sensor data ahead of the next check
+        self._executor = ThreadPoolExecutor(max_workers=2)
+        self._llm_future: Optional[Future] = None
+        self._collect_duration = 0.0
+        
         logger.info(f"Local Agent initialized with model: {model_name}")
     
     def _load_config(self, config_path: str) -> Dict:
@@ -66,29 +96,38 @@ class LocalAgent:
         """
         try:
             if os.path.exists(config_path):
-                with open(config_path, 'r') as f:
-                    return json.load(f)
+                return orjson.loads(Path(config_path).read_bytes())
             else:
                 # Default configuration
                 default_config = {
                     'llm_model': 'llama3.2:1b',
                     'api_base': 'http://localhost:11434',
                     'system_check_interval': 60,  # seconds
+                    'sensor_sample_interval': 1,  # seconds
                     'log_level': 'INFO'
                 }
                 # Save default config
-                with open(config_path, 'w') as f:
-                    json.dump(default_config, f, indent=4)
+                Path(config_path).write_bytes(orjson.dumps(default_config, option=orjson.OPT_INDENT_2))
                 return default_config
         except Exception as e:
             logger.error(f"Error loading configuration: {e}")
             return {}
     
-    def process_user_input(self, user_input: str) -> Dict:
+    def close(self):
+        """Release resources held by the agent's components."""
+        self._executor.shutdown(wait=False)
+        self.ollama.close()
+        self.action_executor.close()
+        self.sensor_manager.close()
+    
+    def process_user_input(self, user_input: str,
+                           on_chunk: Optional[Callable[[str], None]] = None) -> Dict:
         """Process user input and generate a response.
         
         Args:
             user_input: The command or request from the user
+            on_chunk: Optional callback invoked with each response chunk as
+                it is streamed from the LLM
             
         Returns:
             Dict containing the response and any actions to execute
@@ -103,11 +142,22 @@ class LocalAgent:
                 system_data=system_data
             )
             
-            # Send to Ollama and get response
-            llm_response = self.ollama.generate_response(processed_data)
-            
-            # Parse the response to determine actions
-            actions = self.data_processor.extract_actions(llm_response)
+            # Send to Ollama, get response and parse it to determine actions
+            if on_chunk is None:
+                llm_response = self.ollama.generate_response(processed_data)
+                actions = self.data_processor.extract_actions(llm_response)
+            else:
+                chunks = []
+                
+                def relay():
+                    for chunk in self.ollama.generate_response_stream(processed_data):
+                        on_chunk(chunk)
+                        chunks.append(chunk)
+                        yield chunk
+                
+                # Actions are parsed line by line while the response streams in
+                actions = list(self.data_processor.extract_actions_stream(relay()))
+                llm_response = ''.join(chunks)
             
             # Execute actions
             results = self.action_executor.execute_actions(actions)
@@ -127,56 +177,130 @@ class LocalAgent:
     
     def run_cli(self):
         """Run the agent in command-line interface mode."""
+        try:
+            asyncio.run(self.run_cli_async())
+        except KeyboardInterrupt:
+            print("\nExiting...")
+    
+    async def run_cli_async(self):
+        """Run the command-line interface, processing requests off the event loop."""
         print("=== AI Smart Laptop Management ===\n")
         print("Type 'exit' or 'quit' to end the session.\n")
         
+        loop = asyncio.get_running_loop()
+        session = PromptSession()
+        
         while True:
             try:
-                user_input = input("\n> ")
+                user_input = await session.prompt_async("\n> ")
                 
                 if user_input.lower() in ['exit', 'quit']:
                     print("Exiting...")
                     break
                 
-                result = self.process_user_input(user_input)
-                print(f"\nResponse: {result['response']}")
+                streamed = []
+                
+                def print_chunk(chunk: str):
+                    if not streamed:
+                        print("\nResponse: ", end='', flush=True)
+                    streamed.append(chunk)
+                    print(chunk, end='', flush=True)
+                
+                result = await loop.run_in_executor(None, functools.partial(
+                    self.process_user_input, user_input, on_chunk=print_chunk))
+                if streamed:
+                    print()
+                else:
+                    print(f"\nResponse: {result['response']}")
                 
                 if result['actions']:
                     print("\nActions taken:")
                     for i, action in enumerate(result['actions']):
                         print(f"{i+1}. {action['description']}")
                         print(f"   Result: {result['results'][i]}")
-            except KeyboardInterrupt:
+            except (KeyboardInterrupt, EOFError):
                 print("\nExiting...")
                 break
             except Exception as e:
                 print(f"\nError: {str(e)}")
     
+    def _generate_with_timeout(self, processed_data: Dict, timeout: float) -> Optional[str]:
+        """Generate an LLM response on the worker thread, bounded by a timeout.
+        
+        Args:
+            processed_data: Processed data containing the prompt
+            timeout: Maximum number of seconds to wait for the response
+            
+        Returns:
+            The LLM response, or None if it timed out or a previous
+            generation is still running
+        """
+        if self._llm_future is not None and not self._llm_future.done():
+            logger.warning("Previous LLM call is still running, skipping this check")
+            return None
+        
+        self._llm_future = self._executor.submit(self.ollama.generate_response, processed_data)
+        try:
+            return self._llm_future.result(timeout=timeout)
+        except FutureTimeoutError:
+            logger.warning(f"LLM call did not finish within {timeout:.0f}s, skipping this check")
+            return None
+    
+    def _collect_timed(self) -> Mapping:
+        """Collect system data, recording how long the collection took.
+        
+        Returns:
+            Mapping containing all collected system data
+        """
+        start = time.monotonic()
+        system_data = self.sensor_manager.collect_data()
+        self._collect_duration = time.monotonic() - start
+        return system_data
+    
     def run_background_service(self):
         """Run the agent as a background service that periodically checks system state."""
         interval = self.config.get('system_check_interval', 60)
         logger.info(f"Starting background service with {interval}s check interval")
         
+        next_tick = time.monotonic()
+        sensor_future: Optional[Future] = None
+        
         try:
             while True:
-                # Collect system data
-                system_data = self.sensor_manager.collect_data()
+                next_tick += interval
+                
+                # Collect system data, using the prefetch from the last sleep if any
+                if sensor_future is not None:
+                    system_data = sensor_future.result()
+                    sensor_future = None
+                else:
+                    system_data = self._collect_timed()
                 
                 # Check if any automatic actions are needed
-                if self.data_processor.should_take_action(system_data):
-                    processed_data = self.data_processor.process(
-                        user_input="",  # No user input in background mode
-                        system_data=system_data
-                    )
-                    
-                    llm_response = self.ollama.generate_response(processed_data)
-                    actions = self.data_processor.extract_actions(llm_response)
-                    
-                    if actions:
-                        logger.info(f"Taking automatic actions: {actions}")
-                        self.action_executor.execute_actions(actions)
+                should_act, processed_data = self.data_processor.process_with_gate(
+                    user_input="",  # No user input in background mode
+                    system_data=system_data
+                )
+                if should_act:
+                    llm_response = self._generate_with_timeout(processed_data, interval * 0.8)
+                    if llm_response is not None:
+                        actions = self.data_processor.extract_actions(llm_response)
+                        
+                        if actions:
+                            logger.info(f"Taking automatic actions: {actions}")
+                            self.action_executor.execute_actions(actions)
+                
+                # Sleep until the next deadline; if this tick overran, start
+                # the next one immediately rather than bursting to catch up
+                now = time.monotonic()
+                if next_tick < now:
+                    next_tick = now
                 
-                time.sleep(interval)
+                # Start collecting the next tick's data so that it finishes
+                # around the deadline, keeping it fresh but off the critical path
+                time.sleep(max(0, next_tick - self._collect_duration - now))
+                sensor_future = self._executor.submit(self._collect_timed)
+                time.sleep(max(0, next_tick - time.monotonic()))
         except KeyboardInterrupt:
             logger.info("Background service stopped by user")
         except Exception as e:
@@ -195,12 +319,15 @@ def main():
     
     args = parser.parse_args()
     
-    agent = LocalAgent(config_path=args.config)
+    agent = LocalAgent(config_path=args.config, background=args.background)
     
-    if args.background:
-        agent.run_background_service()
-    else:
-        agent.run_cli()
+    try:
+        if args.background:
+            agent.run_background_service()
+        else:
+            agent.run_cli()
+    finally:
+        agent.close()
 
 
 if __name__ == '__main__':
@@ -8,13 +8,25 @@ This module handles communication with the Ollama API to send requests
 and receive responses from the local LLM model.
 """
 
-import json
 import logging
+import os
+import time
+import orjson
 import requests
-from typing import Dict, List, Any, Optional, Union
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from typing import Dict, Iterator, List, Any, Optional, Union
 
 logger = logging.getLogger('ollama_interface')
 
+# On-disk cache of the models available in Ollama, shared across restarts
+MODEL_CACHE_PATH = Path(os.path.expanduser('~')) / '.cache' / 'laptop_agent' / 'ollama_models.json'
+MODEL_CACHE_TTL = 3600  # seconds
+VERIFY_TTL = 300  # seconds
+
+# (connect, read) timeouts for Ollama API calls, in seconds
+REQUEST_TIMEOUT = (2.0, 60.0)
+
 
 class OllamaInterface:
     """Interface for communicating with Ollama API."""
@@ -30,10 +42,35 @@ class OllamaInterface:
         self.api_base = api_base
         self.generate_endpoint = f"{api_base}/api/generate"
         
+        # Reuse one keep-alive connection pool for all API calls, sized so a
+        # few concurrent generations each keep their own connection
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Connection': 'keep-alive'})
+        
+        # Connection to Ollama is verified lazily before the first request
+        self._verified_at: Optional[float] = None
+        
         logger.info(f"Initialized Ollama interface with model: {model_name}")
+    
+    def _ensure_verified(self):
+        """Verify the connection to Ollama if it has not been checked recently."""
+        now = time.monotonic()
+        if self._verified_at is not None and now - self._verified_at <= VERIFY_TTL:
+            return
         
-        # Verify connection to Ollama
-        self._verify_connection()
+        # On the first check, a recent model list from a previous run is enough
+        if self._verified_at is None:
+            model_names = self._load_cached_models()
+            if model_names is not None:
+                self._check_model_available(model_names)
+                self._verified_at = now
+                return
+        
+        if self._verify_connection():
+            self._verified_at = now
     
     def _verify_connection(self) -> bool:
         """Verify connection to Ollama API.
@@ -43,25 +80,66 @@ class OllamaInterface:
         """
         try:
             # Try to get list of models to verify connection
-            response = requests.get(f"{self.api_base}/api/tags")
+            response = self.session.get(f"{self.api_base}/api/tags", timeout=REQUEST_TIMEOUT)
             response.raise_for_status()
             
             # Check if our model is available
-            models = response.json().get('models', [])
+            models = orjson.loads(response.content).get('models', [])
             model_names = [model.get('name') for model in models]
-            
-            if self.model_name not in model_names:
-                logger.warning(f"Model '{self.model_name}' not found in Ollama. Available models: {model_names}")
-                logger.warning(f"You may need to pull the model using: ollama pull {self.model_name}")
-            else:
-                logger.info(f"Successfully connected to Ollama. Model '{self.model_name}' is available.")
+            self._check_model_available(model_names)
+            self._save_cached_models(model_names)
             
             return True
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
             logger.error(f"Failed to connect to Ollama API: {e}")
             logger.error("Make sure Ollama is running and accessible at the configured API base URL.")
             return False
     
+    def _check_model_available(self, model_names: List[str]):
+        """Log whether the configured model is among the available models.
+        
+        Args:
+            model_names: Names of the models available in Ollama
+        """
+        if self.model_name not in model_names:
+            logger.warning(f"Model '{self.model_name}' not found in Ollama. Available models: {model_names}")
+            logger.warning(f"You may need to pull the model using: ollama pull {self.model_name}")
+        else:
+            logger.info(f"Successfully connected to Ollama. Model '{self.model_name}' is available.")
+    
+    def _load_cached_models(self) -> Optional[List[str]]:
+        """Load the available model names cached by a previous run.
+        
+        Returns:
+            List of model names, or None if there is no fresh cache for this API base
+        """
+        try:
+            cached = orjson.loads(MODEL_CACHE_PATH.read_bytes())
+        except (OSError, orjson.JSONDecodeError):
+            return None
+        
+        if not isinstance(cached, dict) or cached.get('api_base') != self.api_base:
+            return None
+        if time.time() - cached.get('checked_at', 0) > MODEL_CACHE_TTL:
+            return None
+        return cached.get('models')
+    
+    def _save_cached_models(self, model_names: List[str]):
+        """Persist the available model names for later runs.
+        
+        Args:
+            model_names: Names of the models available in Ollama
+        """
+        try:
+            MODEL_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            MODEL_CACHE_PATH.write_bytes(orjson.dumps({
+                'api_base': self.api_base,
+                'checked_at': time.time(),
+                'models': model_names
+            }))
+        except OSError as e:
+            logger.debug(f"Could not write Ollama model cache: {e}")
+    
     def generate_response(self, data: Dict) -> str:
         """Generate a response from the LLM using the provided data.
         
@@ -71,29 +149,56 @@ class OllamaInterface:
         Returns:
             String containing the LLM's response
         """
+        return ''.join(self.generate_response_stream(data))
+    
+    def generate_response_stream(self, data: Dict) -> Iterator[str]:
+        """Stream a response from the LLM as it is generated.
+        
+        Args:
+            data: Dictionary containing processed data and prompt
+            
+        Yields:
+            Chunks of the LLM's response text as they arrive
+        """
         try:
+            self._ensure_verified()
+            
             # Prepare the request payload
             payload = {
                 "model": self.model_name,
                 "prompt": data['prompt'],
-                "stream": False
+                "stream": True
             }
             
-            # Send request to Ollama
-            response = requests.post(self.generate_endpoint, json=payload)
-            response.raise_for_status()
-            
-            # Extract and return the response text
-            result = response.json()
-            return result.get('response', '')
+            # Send request to Ollama and read newline-delimited JSON chunks
+            with self.session.post(self.generate_endpoint, data=orjson.dumps(payload),
+                                   headers={'Content-Type': 'application/json'},
+                                   stream=True, timeout=REQUEST_TIMEOUT) as response:
+                response.raise_for_status()
+                
+                for line in response.iter_lines(decode_unicode=False):
+                    if not line:
+                        continue
+                    chunk = orjson.loads(line)
+                    if 'error' in chunk:
+                        error_msg = f"Ollama reported an error: {chunk['error']}"
+                        logger.error(error_msg)
+                        yield f"Error: {error_msg}"
+                        return
+                    
+                    text = chunk.get('response', '')
+                    if text:
+                        yield text
+                    if chunk.get('done'):
+                        return
         except requests.exceptions.RequestException as e:
             error_msg = f"Error communicating with Ollama API: {e}"
             logger.error(error_msg)
-            return f"Error: {error_msg}"
+            yield f"Error: {error_msg}"
         except Exception as e:
             error_msg = f"Unexpected error generating response: {e}"
             logger.error(error_msg)
-            return f"Error: {error_msg}"
+            yield f"Error: {error_msg}"
     
     def get_model_info(self) -> Dict:
         """Get information about the current model.
@@ -102,12 +207,17 @@ class OllamaInterface:
             Dictionary containing model information
         """
         try:
-            response = requests.get(f"{self.api_base}/api/show", params={"name": self.model_name})
+            response = self.session.get(f"{self.api_base}/api/show", params={"name": self.model_name},
+                                        timeout=REQUEST_TIMEOUT)
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return orjson.loads(response.content)
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
             logger.error(f"Error getting model info: {e}")
             return {}
+    
+    def close(self):
+        """Close the underlying HTTP session and its pooled connections."""
+        self.session.close()
 
 
 # For testing
@@ -8,75 +8,396 @@ This module collects data from various system sensors on a Windows machine,
 including CPU, memory, disk usage, battery status, and system logs.
 """
 
+import collections
+import functools
+import heapq
 import logging
-import os
 import platform
 import subprocess
+import threading
 import time
-from typing import Dict, List, Any, Optional, Union
+import types
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Dict, List, Any, Mapping, Optional, Tuple, Union
 
 # For Windows-specific functionality
 import psutil
+import pywintypes
 import win32api
 import win32con
+import win32event
 import win32evtlog
-import win32evtlogutil
+import winerror
 
 logger = logging.getLogger('system_sensors')
 
+# System events from the last hour, for EvtQuery
+_RECENT_EVENTS_QUERY = "*[System[TimeCreated[timediff(@SystemTime) <= 3600000]]]"
+
+# Values reported by a sensor that failed unexpectedly
+_SENSOR_DEFAULTS = {
+    'cpu_usage': 0.0,
+    'memory_usage': 0.0,
+    'disk_usage': types.MappingProxyType({}),
+    'battery': types.MappingProxyType({'present': False}),
+    'power_state': 'Unknown',
+    'running_processes': (),
+    'system_logs': (),
+    'system_info': types.MappingProxyType({})
+}
+
+# Indexes into the values rendered with an EvtRenderContextSystem context
+_EVT_SYSTEM_PROVIDER_NAME = 0
+_EVT_SYSTEM_EVENT_ID = 2
+_EVT_SYSTEM_LEVEL = 4
+_EVT_SYSTEM_TIME_CREATED = 8
+
+# Names of event levels; critical (1) and error (2) events are reported
+# as errors, and anything not listed as INFO
+_EVT_LEVELS = {1: 'ERROR', 2: 'ERROR', 3: 'WARNING'}
+
+
+
+class _LazyEventMessage:
+    """Event description that is only formatted when converted to a string.
+    
+    Formatting an event message loads the publisher's message resources,
+    which is far more expensive than reading the event itself.
+    """
+    
+    __slots__ = ('_pending', '_message')
+    
+    def __init__(self, format_message, *args):
+        """Initialize the lazy message.
+        
+        Args:
+            format_message: Callable formatting the event into a message
+            *args: Arguments for format_message, including the event handle
+        """
+        # The callable and its arguments live in one slot so that threads
+        # formatting the same message concurrently see both or neither
+        self._pending = (format_message, args)
+        self._message = None
+    
+    def __str__(self) -> str:
+        pending = self._pending
+        if pending is None:
+            return self._message
+        
+        format_message, args = pending
+        message = format_message(*args)
+        # Publish the message before dropping the event handle, which is no
+        # longer needed once the message is known
+        self._message = message
+        self._pending = None
+        return message
+    
+    def __repr__(self) -> str:
+        return repr(str(self))
+
+
+@dataclass
+class ProcessRow:
+    """Resource usage of a running process."""
+    
+    __slots__ = ('pid', 'name', 'username', 'cpu_usage', 'memory_usage')
+    
+    pid: int
+    name: str
+    username: Optional[str]
+    cpu_usage: float
+    memory_usage: float
+    
+    def to_dict(self) -> Dict:
+        """Convert the row into a dictionary for serialization."""
+        return {
+            'pid': self.pid,
+            'name': self.name,
+            'username': self.username,
+            'cpu_usage': self.cpu_usage,
+            'memory_usage': self.memory_usage
+        }
+
+
+@dataclass
+class LogRow:
+    """Entry read from the System event log."""
+    
+    __slots__ = ('source', 'time', 'level', 'event_id', 'description')
+    
+    source: str
+    time: str
+    level: str
+    event_id: int
+    description: Union[str, _LazyEventMessage]
+    
+    def to_dict(self) -> Dict:
+        """Convert the row into a dictionary for serialization.
+        
+        This formats the event description if it has not been already.
+        """
+        return {
+            'source': self.source,
+            'time': self.time,
+            'level': self.level,
+            'event_id': self.event_id,
+            'description': str(self.description)
+        }
+
 
 class SystemSensorManager:
     """Manages the collection of system sensor data."""
     
-    def __init__(self):
-        """Initialize the system sensor manager."""
+    def __init__(self, sample_interval: Optional[float] = 1.0):
+        """Initialize the system sensor manager.
+        
+        Args:
+            sample_interval: Seconds between background refreshes of expired
+                sensors, or None to refresh them in collect_data instead
+        """
         # Verify we're running on Windows
         if platform.system() != 'Windows':
             logger.warning("This module is designed for Windows systems")
         
-        # Initialize sensor cache
-        self.cache = {}
-        self.cache_timeout = 5  # seconds
-        self.last_cache_time = 0
+        # Sensors in the order they are reported
+        self._sensors = {
+            # System resource usage
+            'cpu_usage': self._get_cpu_usage,
+            'memory_usage': self._get_memory_usage,
+            'disk_usage': self._get_disk_usage,
+            
+            # System state
+            'battery': self._get_battery_info,
+            'power_state': self._get_power_state,
+            'running_processes': self._get_running_processes,
+            'system_logs': self._get_system_logs,
+            
+            # System info
+            'system_info': self._get_system_info
+        }
+        
+        # Initialize sensor cache: each reading is kept as (value, expiry)
+        # for a TTL matching how quickly it changes
+        self.cache_ttls = {
+            'cpu_usage': 2,  # seconds
+            'memory_usage': 2,
+            'disk_usage': 60,
+            'battery': 10,
+            'power_state': 10,
+            'running_processes': 5,
+            'system_logs': 10,
+            'system_info': 3600
+        }
+        # Failed readings are retried sooner than slow-changing ones expire
+        self.error_retry_ttl = 10  # seconds
+        self._cache = {}
+        
+        # Last error of each sensor as ((type, message), repeat count), so a
+        # sensor failing the same way on every refresh does not flood the log
+        self.error_log_interval = 100  # repeats between reminders
+        self._last_errors = {}
+        
+        # Read-only view of the latest readings with a version that is bumped
+        # whenever any reading is refreshed, shared by every caller until then
+        self._snapshot = (0, types.MappingProxyType({}))
+        
+        # Expired sensors are refreshed concurrently; most of their time is
+        # spent in system calls that release the GIL
+        self._executor = ThreadPoolExecutor(max_workers=4)
+        self._refresh_lock = threading.Lock()
+        
+        # Background thread refreshing expired sensors, started by the first
+        # collect_data call so callers only read the latest snapshot
+        self.sample_interval = sample_interval
+        self._sampler = None
+        self._sampler_lock = threading.Lock()
+        self._stop_sampling = threading.Event()
+        
+        # Prime psutil's CPU counters so later reads return the usage since
+        # the previous read without blocking
+        self.cpu_min_interval = 0.1  # seconds
+        psutil.cpu_percent(interval=None)
+        self._last_cpu_sample_time = time.monotonic()
+        self._last_cpu_usage = 0.0
+        
+        # Mountpoints of fixed drives, re-enumerated only every few minutes
+        # since listing partitions is far slower than reading their usage
+        self.partitions_ttl = 300  # seconds
+        self._partitions = []
+        self._partitions_expiry = 0.0
+        
+        # PIDs whose per-process CPU counter has been primed by a previous read
+        self._primed_pids = set()
+        
+        # Event log rendering state, reused across reads
+        self._system_render_context = win32evtlog.EvtCreateRenderContext(
+            win32evtlog.EvtRenderContextSystem)
+        self._user_render_context = win32evtlog.EvtCreateRenderContext(
+            win32evtlog.EvtRenderContextUser)
+        self._publisher_metadata = {}
+        
+        # Formatted messages keyed by (source, event ID, insertion strings),
+        # evicting the least recently used beyond the size limit
+        self.message_cache_size = 1024
+        self._message_cache = collections.OrderedDict()
+        self._message_cache_lock = threading.Lock()
+        
+        # Subscription to the System channel, read incrementally from a
+        # bookmark; opened on the first read
+        self._log_subscription = None
+        self._log_signal = None
+        self._log_bookmark = None
+        self._recent_logs = collections.deque()
+        self.log_batch_size = 64  # events pulled per EvtNext call
     
-    def collect_data(self) -> Dict:
+    def collect_data(self) -> Mapping:
         """Collect data from all system sensors.
         
+        The first call reads every sensor and starts the background sampler;
+        later calls return the latest readings without blocking. Without a
+        sample interval, each call refreshes the expired sensors itself. The
+        result is a read-only snapshot shared between callers; use
+        dict(result) for a copy that can be modified.
+        
         Returns:
-            Dictionary containing all collected system data
+            Mapping containing all collected system data
         """
-        current_time = time.time()
+        if self.sample_interval is None:
+            self._refresh()
+        elif self._sampler is None and not self._stop_sampling.is_set():
+            with self._sampler_lock:
+                if self._sampler is None and not self._stop_sampling.is_set():
+                    self._refresh()
+                    self._sampler = threading.Thread(
+                        target=self._sample_loop, name='sensor-sampler', daemon=True)
+                    self._sampler.start()
         
-        # Use cached data if it's recent enough
-        if current_time - self.last_cache_time < self.cache_timeout and self.cache:
-            return self.cache.copy()
+        return self._snapshot[1]
+    
+    @property
+    def snapshot_version(self) -> int:
+        """Version of the latest snapshot, increased each time one is published.
         
+        Consumers can compare it with the version they last processed to
+        skip work when collect_data would return the same snapshot.
+        """
+        return self._snapshot[0]
+    
+    def _sample_loop(self):
+        """Refresh expired sensors every sample interval until closed."""
+        while not self._stop_sampling.wait(self.sample_interval):
+            self._refresh()
+    
+    def _refresh(self):
+        """Refresh the sensors whose cached readings have expired.
+        
+        A new snapshot is published only when at least one reading expired
+        and was read again, even if its value is unchanged.
+        """
         try:
-            # Collect all sensor data
-            data = {
-                # System resource usage
-                'cpu_usage': self._get_cpu_usage(),
-                'memory_usage': self._get_memory_usage(),
-                'disk_usage': self._get_disk_usage(),
+            with self._refresh_lock:
+                current_time = time.monotonic()
                 
-                # System state
-                'battery': self._get_battery_info(),
-                'power_state': self._get_power_state(),
-                'running_processes': self._get_running_processes(),
-                'system_logs': self._get_system_logs(),
+                # Refresh only the readings whose cached value has expired
+                stale = [key for key in self._sensors
+                         if key not in self._cache or current_time >= self._cache[key][1]]
+                if not stale:
+                    return
                 
-                # System info
-                'system_info': self._get_system_info()
-            }
-            
-            # Update cache
-            self.cache = data.copy()
-            self.last_cache_time = current_time
-            
-            return data
+                shared_args, errors = self._take_shared_samples(stale)
+                tasks = {
+                    self._executor.submit(self._sensors[key], *shared_args.get(key, ())): key
+                    for key in stale if key not in errors
+                }
+                for future in as_completed(tasks):
+                    key = tasks[future]
+                    try:
+                        value = future.result()
+                    except Exception as e:
+                        errors[key] = e
+                        continue
+                    
+                    # A successful read ends any run of repeated errors
+                    self._last_errors.pop(key, None)
+                    self._cache[key] = (value, current_time + self.cache_ttls[key])
+                
+                # Failed sensors report their no-data values until retried
+                for key, error in errors.items():
+                    self._log_sensor_error(key, error)
+                    retry_ttl = min(self.cache_ttls[key], self.error_retry_ttl)
+                    self._cache[key] = (_SENSOR_DEFAULTS[key], current_time + retry_ttl)
+                
+                # Replacing the tuple publishes version and data together
+                version = self._snapshot[0] + 1
+                data = types.MappingProxyType({key: self._cache[key][0] for key in self._sensors})
+                self._snapshot = (version, data)
         except Exception as e:
             logger.error(f"Error collecting system data: {e}")
-            return {}
+    
+    def _log_sensor_error(self, sensor: str, error: Exception):
+        """Log a sensor failure, suppressing repeats of the same error.
+        
+        An error is logged when it first appears and then once every
+        `error_log_interval` consecutive repeats; a successful read of the
+        sensor resets the count.
+        
+        Args:
+            sensor: Key of the failing sensor
+            error: Exception raised while reading it
+        """
+        if not logger.isEnabledFor(logging.ERROR):
+            return
+        
+        signature = (type(error), str(error))
+        last = self._last_errors.get(sensor)
+        count = last[1] + 1 if last is not None and last[0] == signature else 1
+        self._last_errors[sensor] = (signature, count)
+        
+        if count == 1:
+            logger.error(f"Error getting {sensor}: {error}")
+        elif (count - 1) % self.error_log_interval == 0:
+            logger.error(f"Error getting {sensor}: {error} (repeated {count - 1} times)")
+    
+    def close(self):
+        """Stop the sampler and the worker threads used to refresh sensors."""
+        self._stop_sampling.set()
+        with self._sampler_lock:
+            sampler = self._sampler
+        if sampler is not None:
+            sampler.join(timeout=self.sample_interval)
+        self._executor.shutdown(wait=False)
+    
+    def _take_shared_samples(self, stale: List[str]) -> Tuple[Dict[str, tuple], Dict[str, Exception]]:
+        """Take psutil samples used by more than one sensor once per refresh.
+        
+        Args:
+            stale: Keys of the sensors being refreshed
+            
+        Returns:
+            Tuple of a dictionary mapping sensor keys to the arguments to call
+            them with, and one mapping the keys of sensors whose sample could
+            not be taken to the error raised
+        """
+        shared_args = {}
+        errors = {}
+        
+        if 'memory_usage' in stale:
+            try:
+                shared_args['memory_usage'] = (psutil.virtual_memory(),)
+            except Exception as e:
+                errors['memory_usage'] = e
+        
+        battery_keys = [key for key in ('battery', 'power_state') if key in stale]
+        if battery_keys:
+            try:
+                battery = psutil.sensors_battery() if hasattr(psutil, 'sensors_battery') else None
+            except Exception as e:
+                errors.update(dict.fromkeys(battery_keys, e))
+            else:
+                shared_args.update(dict.fromkeys(battery_keys, (battery,)))
+        
+        return shared_args, errors
     
     def _get_cpu_usage(self) -> float:
         """Get current CPU usage percentage.
@@ -84,184 +405,329 @@ class SystemSensorManager:
         Returns:
             CPU usage as a percentage (0-100)
         """
-        try:
-            return psutil.cpu_percent(interval=0.5)
-        except Exception as e:
-            logger.error(f"Error getting CPU usage: {e}")
-            return 0.0
+        # Samples taken too close together are mostly noise; reuse the last one
+        now = time.monotonic()
+        if now - self._last_cpu_sample_time < self.cpu_min_interval:
+            return self._last_cpu_usage
+        
+        self._last_cpu_usage = psutil.cpu_percent(interval=None)
+        self._last_cpu_sample_time = now
+        return self._last_cpu_usage
     
-    def _get_memory_usage(self) -> float:
+    def _get_memory_usage(self, memory) -> float:
         """Get current memory usage percentage.
         
+        Args:
+            memory: Result of psutil.virtual_memory()
+            
         Returns:
             Memory usage as a percentage (0-100)
         """
-        try:
-            memory = psutil.virtual_memory()
-            return memory.percent
-        except Exception as e:
-            logger.error(f"Error getting memory usage: {e}")
-            return 0.0
+        return memory.percent
     
-    def _get_disk_usage(self) -> Dict:
+    def _get_disk_usage(self) -> Mapping:
         """Get disk usage for all drives.
         
         Returns:
-            Dictionary with drive letters as keys and usage info as values
+            Read-only mapping with drive letters as keys and usage info as values
         """
-        try:
-            # Get system drive usage (usually C:)
-            system_drive = os.environ.get('SystemDrive', 'C:')
-            usage = psutil.disk_usage(system_drive)
+        drives = {}
+        for mountpoint in self._get_fixed_partitions():
+            try:
+                usage = psutil.disk_usage(mountpoint)
+            except OSError as e:
+                logger.debug(f"Error getting disk usage for {mountpoint}: {e}")
+                continue
             
-            return {
+            drives[mountpoint.rstrip('\\')] = types.MappingProxyType({
                 'total': usage.total,
                 'used': usage.used,
                 'free': usage.free,
                 'percent': usage.percent
-            }
-        except Exception as e:
-            logger.error(f"Error getting disk usage: {e}")
-            return {'percent': 0.0}
+            })
+        
+        return types.MappingProxyType(drives)
     
-    def _get_battery_info(self) -> Dict:
-        """Get battery status information.
+    def _get_fixed_partitions(self) -> List[str]:
+        """Get the mountpoints of fixed drives, re-enumerating when stale.
         
         Returns:
-            Dictionary containing battery information
+            List of mountpoints, e.g. ['C:\\', 'D:\\']
         """
-        try:
-            if not hasattr(psutil, 'sensors_battery'):
-                return {'present': False}
-            
-            battery = psutil.sensors_battery()
-            if battery is None:
-                return {'present': False}
+        now = time.monotonic()
+        if now >= self._partitions_expiry:
+            self._partitions = [
+                partition.mountpoint
+                for partition in psutil.disk_partitions(all=False)
+                if 'fixed' in partition.opts
+            ]
+            self._partitions_expiry = now + self.partitions_ttl
+        
+        return self._partitions
+    
+    def _get_battery_info(self, battery) -> Mapping:
+        """Get battery status information.
+        
+        Args:
+            battery: Result of psutil.sensors_battery(), or None without a battery
             
-            return {
-                'present': True,
-                'percentage': battery.percent,
-                'is_charging': battery.power_plugged,
-                'seconds_left': battery.secsleft if battery.secsleft != -1 else None
-            }
-        except Exception as e:
-            logger.error(f"Error getting battery info: {e}")
-            return {'present': False}
+        Returns:
+            Read-only mapping containing battery information
+        """
+        if battery is None:
+            return _SENSOR_DEFAULTS['battery']
+        
+        return types.MappingProxyType({
+            'present': True,
+            'percentage': battery.percent,
+            'is_charging': battery.power_plugged,
+            'seconds_left': battery.secsleft if battery.secsleft != -1 else None
+        })
     
-    def _get_power_state(self) -> str:
+    def _get_power_state(self, battery) -> str:
         """Get the current power state of the system.
         
+        Args:
+            battery: Result of psutil.sensors_battery(), or None without a battery
+            
         Returns:
             String indicating power state ('AC', 'Battery', 'Unknown')
         """
-        try:
-            battery = psutil.sensors_battery()
-            if battery is None:
-                return 'AC'  # Assume desktop
-            
-            return 'AC' if battery.power_plugged else 'Battery'
-        except Exception as e:
-            logger.error(f"Error getting power state: {e}")
-            return 'Unknown'
+        if battery is None:
+            return 'AC'  # Assume desktop
+        
+        return 'AC' if battery.power_plugged else 'Battery'
     
-    def _get_running_processes(self, limit: int = 10) -> List[Dict]:
+    def _get_running_processes(self, limit: int = 10) -> Tuple[ProcessRow, ...]:
         """Get information about running processes.
         
         Args:
             limit: Maximum number of processes to return
             
         Returns:
-            List of dictionaries containing process information
+            Tuple of rows containing process information
         """
-        try:
-            processes = []
-            for proc in psutil.process_iter(['pid', 'name', 'username', 'cpu_percent', 'memory_percent']):
-                try:
-                    pinfo = proc.info
-                    processes.append({
-                        'pid': pinfo['pid'],
-                        'name': pinfo['name'],
-                        'username': pinfo['username'],
-                        'cpu_usage': pinfo['cpu_percent'],
-                        'memory_usage': pinfo['memory_percent']
-                    })
-                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                    pass
+        primed_pids = self._primed_pids
+        
+        # Only CPU usage is read for every process, into a column parallel
+        # to the process list; the first read of a process only primes
+        # its CPU counter
+        procs = []
+        cpu = []
+        for proc in psutil.process_iter(['cpu_percent']):
+            procs.append(proc)
+            cpu.append((proc.info['cpu_percent'] or 0.0) if proc.pid in primed_pids else 0.0)
+        self._primed_pids = {proc.pid for proc in procs}
+        
+        # The busiest are selected from the column without sorting the
+        # whole process table
+        top = heapq.nlargest(limit, range(len(cpu)), key=cpu.__getitem__)
+        
+        processes = []
+        for i in top:
+            proc = procs[i]
+            # Read the remaining attributes from a single batch of system
+            # calls; attributes we may not read come back as None
+            try:
+                with proc.oneshot():
+                    pinfo = proc.as_dict(attrs=['name', 'username', 'memory_percent'],
+                                         ad_value=None)
+            except psutil.NoSuchProcess:
+                # Exited since the process table was read
+                continue
             
-            # Sort by CPU usage and limit results
-            return sorted(processes, key=lambda p: p['cpu_usage'], reverse=True)[:limit]
-        except Exception as e:
-            logger.error(f"Error getting running processes: {e}")
-            return []
+            if pinfo['name'] is None:
+                continue
+            
+            processes.append(ProcessRow(
+                pid=proc.pid,
+                name=pinfo['name'],
+                username=pinfo['username'],
+                cpu_usage=cpu[i],
+                memory_usage=pinfo['memory_percent']
+            ))
+        
+        return tuple(processes)
     
-    def _get_system_logs(self, limit: int = 10) -> List[Dict]:
+    def _get_system_logs(self, limit: int = 10) -> Tuple[LogRow, ...]:
         """Get recent system event logs.
         
+        The most recent events are read once with EvtQuery; after that only
+        events that arrived since the last read are pulled from a persistent
+        subscription.
+        
         Args:
             limit: Maximum number of logs to return
             
         Returns:
-            List of dictionaries containing log information
+            Tuple of rows containing log information, newest first
         """
         try:
-            logs = []
-            server = 'localhost'
-            log_type = 'System'
+            if self._log_subscription is None or self._recent_logs.maxlen != limit:
+                self._open_log_subscription(limit)
+            else:
+                self._drain_log_subscription(limit)
             
-            hand = win32evtlog.OpenEventLog(server, log_type)
-            flags = win32evtlog.EVENTLOG_BACKWARDS_READ | win32evtlog.EVENTLOG_SEQUENTIAL_READ
-            total = win32evtlog.GetNumberOfEventLogRecords(hand)
+            return tuple(reversed(self._recent_logs))
+        except Exception:
+            # Drop the subscription so the next read starts over from EvtQuery
+            self._log_subscription = None
+            raise
+    
+    def _open_log_subscription(self, limit: int):
+        """Read the newest events and subscribe to events arriving after them.
+        
+        Args:
+            limit: Maximum number of recent events to keep
+        """
+        query = win32evtlog.EvtQuery(
+            'System',
+            win32evtlog.EvtQueryChannelPath | win32evtlog.EvtQueryReverseDirection,
+            _RECENT_EVENTS_QUERY
+        )
+        
+        # Fetch the newest events in a single batch
+        events = win32evtlog.EvtNext(query, limit)
+        
+        self._recent_logs = collections.deque(
+            (self._make_log_entry(event) for event in reversed(events)), maxlen=limit)
+        
+        self._log_bookmark = win32evtlog.EvtCreateBookmark(None)
+        if events:
+            win32evtlog.EvtUpdateBookmark(self._log_bookmark, events[0])
+            flags = win32evtlog.EvtSubscribeStartAfterBookmark
+        else:
+            flags = win32evtlog.EvtSubscribeToFutureEvents
+        
+        if self._log_signal is None:
+            self._log_signal = win32event.CreateEvent(None, True, True, None)
+        self._log_subscription = win32evtlog.EvtSubscribe(
+            'System', flags,
+            SignalEvent=self._log_signal,
+            Bookmark=self._log_bookmark if events else None
+        )
+    
+    def _drain_log_subscription(self, limit: int):
+        """Pull events that arrived since the last read into the recent logs.
+        
+        Pending events are pulled in large batches, but only the newest
+        `limit` of them are rendered, since older ones would be evicted from
+        the recent logs straight away.
+        
+        Args:
+            limit: Maximum number of recent events to keep
+        """
+        # Subscriptions deliver events oldest first
+        pending = collections.deque(maxlen=limit)
+        while True:
+            try:
+                events = win32evtlog.EvtNext(self._log_subscription, self.log_batch_size, 0)
+            except pywintypes.error as e:
+                if e.winerror in (winerror.ERROR_NO_MORE_ITEMS, winerror.ERROR_TIMEOUT):
+                    break
+                raise
             
-            events = win32evtlog.ReadEventLog(hand, flags, 0)
-            count = 0
+            if not events:
+                break
+            pending.extend(events)
             
-            while events and count < limit:
-                for event in events:
-                    level = 'INFO'
-                    if event.EventType == win32evtlog.EVENTLOG_ERROR_TYPE:
-                        level = 'ERROR'
-                    elif event.EventType == win32evtlog.EVENTLOG_WARNING_TYPE:
-                        level = 'WARNING'
-                    
-                    logs.append({
-                        'source': event.SourceName,
-                        'time': event.TimeGenerated.Format(),
-                        'level': level,
-                        'event_id': event.EventID,
-                        'description': str(win32evtlogutil.SafeFormatMessage(event, log_type))
-                    })
-                    count += 1
-                    if count >= limit:
-                        break
-                
-                events = win32evtlog.ReadEventLog(hand, flags, 0)
+            if len(events) < self.log_batch_size:
+                break
+        
+        if pending:
+            self._recent_logs.extend(self._make_log_entry(event) for event in pending)
+            win32evtlog.EvtUpdateBookmark(self._log_bookmark, pending[-1])
+        
+        win32event.ResetEvent(self._log_signal)
+    
+    def _make_log_entry(self, event) -> LogRow:
+        """Build a log row from an event handle.
+        
+        Args:
+            event: Event handle returned by EvtNext
             
-            win32evtlog.CloseEventLog(hand)
-            return logs
-        except Exception as e:
-            logger.error(f"Error getting system logs: {e}")
-            return []
+        Returns:
+            Row containing log information
+        """
+        values = win32evtlog.EvtRender(
+            event, win32evtlog.EvtRenderEventValues, self._system_render_context)
+        
+        level = _EVT_LEVELS.get(values[_EVT_SYSTEM_LEVEL][0], 'INFO')
+        source = values[_EVT_SYSTEM_PROVIDER_NAME][0]
+        event_id = values[_EVT_SYSTEM_EVENT_ID][0]
+        return LogRow(
+            source=source,
+            time=values[_EVT_SYSTEM_TIME_CREATED][0].Format(),
+            level=level,
+            event_id=event_id,
+            description=_LazyEventMessage(self._format_event_message, source, event_id, event)
+        )
     
-    def _get_system_info(self) -> Dict:
-        """Get general system information.
+    def _format_event_message(self, source: str, event_id: int, event) -> str:
+        """Format the message of an event using its publisher's metadata.
+        
+        Messages are pure functions of the publisher's template and the
+        event's insertion strings, so repeated events are served from a cache.
         
+        Args:
+            source: Name of the event's provider
+            event_id: Identifier of the event
+            event: Event handle returned by EvtNext
+            
         Returns:
-            Dictionary containing system information
+            Formatted event message, or an empty string if unavailable
         """
         try:
-            info = {
-                'os': platform.system(),
-                'os_version': platform.version(),
-                'hostname': platform.node(),
-                'cpu_count': psutil.cpu_count(logical=True),
-                'physical_cpu_count': psutil.cpu_count(logical=False),
-                'total_memory': psutil.virtual_memory().total,
-                'boot_time': psutil.boot_time()
-            }
-            return info
+            inserts = win32evtlog.EvtRender(
+                event, win32evtlog.EvtRenderEventValues, self._user_render_context)
+            key = (source, event_id, tuple(str(value) for value, _ in inserts))
+            
+            with self._message_cache_lock:
+                message = self._message_cache.get(key)
+                if message is not None:
+                    self._message_cache.move_to_end(key)
+                    return message
+            
+            metadata = self._publisher_metadata.get(source)
+            if metadata is None:
+                metadata = win32evtlog.EvtOpenPublisherMetadata(source)
+                self._publisher_metadata[source] = metadata
+            
+            message = win32evtlog.EvtFormatMessage(metadata, event, win32evtlog.EvtFormatMessageEvent)
+            
+            with self._message_cache_lock:
+                self._message_cache[key] = message
+                if len(self._message_cache) > self.message_cache_size:
+                    self._message_cache.popitem(last=False)
+            
+            return message
         except Exception as e:
-            logger.error(f"Error getting system info: {e}")
-            return {}
+            logger.debug(f"Could not format message for event from {source}: {e}")
+            return ''
+    
+    def _get_system_info(self) -> Mapping:
+        """Get general system information.
+        
+        Returns:
+            Read-only mapping containing system information
+        """
+        return self._system_info
+    
+    @functools.cached_property
+    def _system_info(self) -> Mapping:
+        """System information that does not change while the agent runs.
+        
+        Computed on first access; a failed attempt is retried on the next.
+        """
+        return types.MappingProxyType({
+            'os': platform.system(),
+            'os_version': platform.version(),
+            'hostname': platform.node(),
+            'cpu_count': psutil.cpu_count(logical=True),
+            'physical_cpu_count': psutil.cpu_count(logical=False),
+            'total_memory': psutil.virtual_memory().total,
+            'boot_time': psutil.boot_time()
+        })
 
 
 # For testing
@@ -279,14 +745,16 @@ if __name__ == '__main__':
     # Print collected data
     print("\nSystem Sensor Data:")
     for key, value in data.items():
-        if isinstance(value, dict):
+        if isinstance(value, Mapping):
             print(f"\n{key}:")
             for k, v in value.items():
                 print(f"  {k}: {v}")
-        elif isinstance(value, list):
+        elif isinstance(value, (list, tuple)):
             print(f"\n{key}:")
             for i, item in enumerate(value):
                 print(f"  Item {i+1}:")
+                if isinstance(item, (ProcessRow, LogRow)):
+                    item = item.to_dict()
                 if isinstance(item, dict):
                     for k, v in item.items():
                         print(f"    {k}: {v}")